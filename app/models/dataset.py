@@ -9,11 +9,31 @@ class Dataset(db.Model):
     dataset_name = db.Column(db.String(255), nullable=False)
     dataset_type = db.Column(db.String(100), nullable=False)
     layer = db.Column(db.String(100), nullable=False)
-    upstream_dependencies = db.Column(ARRAY(db.String), nullable=True, default=list)
+    # Native array on Postgres; JSON on SQLite, which the test suite runs on
+    upstream_dependencies = db.Column(
+        ARRAY(db.String).with_variant(db.JSON, 'sqlite'),
+        nullable=True,
+        default=list
+    )
     status = db.Column(db.String(50), nullable=False, default='active')
     created_ts = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_ts = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        # Backs keyset pagination in get_datasets
+        db.Index('ix_datasets_created_ts_dataset_id', created_ts.desc(), dataset_id.desc()),
+        # Filter combinations accepted by get_datasets
+        db.Index('ix_datasets_layer_status', 'layer', 'status'),
+        db.Index('ix_datasets_type_status', 'dataset_type', 'status'),
+        # Common "active only" listing
+        db.Index(
+            'ix_datasets_active',
+            'layer',
+            postgresql_where=db.text("status = 'active'"),
+            sqlite_where=db.text("status = 'active'")
+        ),
+    )
+    
     def to_dict(self):
         """Convert dataset to dictionary"""
         return {
@@ -23,8 +43,9 @@ class Dataset(db.Model):
             'layer': self.layer,
             'upstream_dependencies': self.upstream_dependencies or [],
             'status': self.status,
-            'created_ts': self.created_ts.isoformat() if self.created_ts else None,
-            'updated_ts': self.updated_ts.isoformat() if self.updated_ts else None
+            # Serialized natively by the orjson JSON provider
+            'created_ts': self.created_ts,
+            'updated_ts': self.updated_ts
         }
     
     def __repr__(self):
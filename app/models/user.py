@@ -1,4 +1,5 @@
-from app import db, bcrypt
+from app import db
+from app.services.password_hashing import hash_password, verify_password
 from datetime import datetime
 
 class User(db.Model):
@@ -16,11 +17,11 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set the password"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check if provided password matches the hash"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         """Convert user to dictionary"""
@@ -31,8 +32,9 @@ class User(db.Model):
             'first_name': self.first_name,
             'last_name': self.last_name,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            # Serialized natively by the orjson JSON provider, like Dataset.to_dict
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
     
     def __repr__(self):
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app import db, limiter
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
+from app import db, limiter, per_user_key
 from app.models.user import User
+from app.services import auth_cache
 from datetime import datetime
+import time
+from sqlalchemy import or_
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -19,11 +22,13 @@ def register():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Check if user already exists
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already exists'}), 400
-        
-        if User.query.filter_by(email=data['email']).first():
+        # Check if user already exists (single round-trip over both unique indexes)
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == data['username'], User.email == data['email'])
+        ).first()
+        if existing:
+            if existing.username == data['username']:
+                return jsonify({'error': 'Username already exists'}), 400
             return jsonify({'error': 'Email already exists'}), 400
         
         # Create new user
@@ -84,19 +89,38 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """Revoke the current access token"""
+    try:
+        jwt_payload = get_jwt()
+        # Tokens carry no exp claim when JWT_ACCESS_TOKEN_EXPIRES is False
+        exp = jwt_payload.get('exp')
+        auth_cache.revoke_token(jwt_payload['jti'], exp - time.time() if exp is not None else None)
+        auth_cache.invalidate_user(get_jwt_identity())
+        
+        return jsonify({
+            'message': 'Logout successful'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
+@limiter.exempt
 def get_profile():
     """Get current user profile"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = auth_cache.get_cached_user(user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
-            'user': user.to_dict()
+            'user': user
         }), 200
         
     except Exception as e:
@@ -104,6 +128,7 @@ def get_profile():
 
 @auth_bp.route('/profile', methods=['PUT'])
 @jwt_required()
+@limiter.limit("20 per minute", key_func=per_user_key)
 def update_profile():
     """Update current user profile"""
     try:
@@ -132,6 +157,7 @@ def update_profile():
         
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        auth_cache.invalidate_user(user_id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -1,15 +1,54 @@
-from flask import Blueprint, request, jsonify
+import orjson
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db, limiter
+from app import db, limiter, per_user_key
 from app.models.dataset import Dataset
+from app.utils.json_provider import ORJSON_OPTIONS
+from app.utils.pagination import encode_cursor, decode_cursor, approximate_count
+from app.utils.sql import conflict_insert
 from datetime import datetime
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import raiseload
 
 datasets_bp = Blueprint('datasets', __name__)
 
+# Rows fetched per server-side cursor batch when streaming listings
+STREAM_BATCH_SIZE = 500
+
+# Maximum ids bound into a single IN (...) when validating dependencies
+ID_LOOKUP_CHUNK_SIZE = 500
+
+def batch_fetch_existing_ids(ids, exclude_id=None):
+    """Return the subset of ids that exist, querying in IN-list chunks"""
+    ids = list(set(ids))
+    existing_ids = set()
+    for start in range(0, len(ids), ID_LOOKUP_CHUNK_SIZE):
+        stmt = select(Dataset.dataset_id).where(
+            Dataset.dataset_id.in_(ids[start:start + ID_LOOKUP_CHUNK_SIZE])
+        )
+        if exclude_id is not None:
+            stmt = stmt.where(Dataset.dataset_id != exclude_id)
+        existing_ids.update(db.session.scalars(stmt))
+    return existing_ids
+
+def _stream_datasets(query):
+    """Yield a {"datasets": [...]} document one database batch at a time"""
+    yield b'{"datasets":['
+    result = db.session.execute(
+        query.statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    first = True
+    for partition in result.scalars().partitions():
+        chunk = b','.join(
+            orjson.dumps(dataset.to_dict(), option=ORJSON_OPTIONS) for dataset in partition
+        )
+        yield chunk if first else b',' + chunk
+        first = False
+    yield b']}'
+
 @datasets_bp.route('', methods=['GET'])
 @jwt_required()
-@limiter.limit("100 per minute")
+@limiter.exempt
 def get_datasets():
     """Get all datasets with optional filtering"""
     try:
@@ -17,11 +56,12 @@ def get_datasets():
         status = request.args.get('status')
         dataset_type = request.args.get('dataset_type')
         layer = request.args.get('layer')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        per_page = max(request.args.get('per_page', 20, type=int), 1)
         
-        # Build query
-        query = Dataset.query
+        # Build query; raiseload keeps any future relationship from
+        # lazy-loading once per row while serializing
+        query = Dataset.query.options(raiseload('*'))
         
         if status:
             query = query.filter(Dataset.status == status)
@@ -30,21 +70,48 @@ def get_datasets():
         if layer:
             query = query.filter(Dataset.layer == layer)
         
-        # Pagination
-        pagination = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Full export without pagination, serialized as rows arrive
+        if request.args.get('stream', type=int) == 1:
+            query = query.order_by(Dataset.created_ts.desc(), Dataset.dataset_id.desc())
+            return Response(
+                stream_with_context(_stream_datasets(query)),
+                mimetype='application/json'
+            )
+        
+        # Planner estimate for the whole table, exact count when filtered
+        total = None
+        if not (status or dataset_type or layer):
+            total = approximate_count(Dataset.__tablename__)
+        if total is None:
+            total = query.order_by(None).count()
+        
+        # Keyset pagination on (created_ts, dataset_id), newest first
+        if cursor:
+            try:
+                cursor_ts, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(
+                tuple_(Dataset.created_ts, Dataset.dataset_id) < (cursor_ts, cursor_id)
+            )
         
-        datasets = [dataset.to_dict() for dataset in pagination.items]
+        rows = query.order_by(
+            Dataset.created_ts.desc(),
+            Dataset.dataset_id.desc()
+        ).limit(per_page + 1).all()
+        
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = encode_cursor(rows[-1].created_ts, rows[-1].dataset_id)
+        
+        datasets = [dataset.to_dict() for dataset in rows]
         
         return jsonify({
             'datasets': datasets,
-            'total': pagination.total,
-            'page': page,
+            'total': total,
             'per_page': per_page,
-            'pages': pagination.pages
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -52,7 +119,7 @@ def get_datasets():
 
 @datasets_bp.route('/<dataset_id>', methods=['GET'])
 @jwt_required()
-@limiter.limit("100 per minute")
+@limiter.exempt
 def get_dataset(dataset_id):
     """Get a specific dataset by ID"""
     try:
@@ -70,7 +137,7 @@ def get_dataset(dataset_id):
 
 @datasets_bp.route('', methods=['POST'])
 @jwt_required()
-@limiter.limit("20 per minute")
+@limiter.limit("20 per minute", key_func=per_user_key)
 def create_dataset():
     """Create a new dataset"""
     try:
@@ -82,51 +149,48 @@ def create_dataset():
             if not data.get(field):
                 return jsonify({'error': f'{field} is required'}), 400
         
-        # Check if dataset_id already exists
-        if Dataset.query.get(data['dataset_id']):
-            return jsonify({'error': 'Dataset ID already exists'}), 400
-        
         # Validate upstream_dependencies - ensure all referenced datasets exist
         upstream_deps = data.get('upstream_dependencies', [])
         if upstream_deps:
-            existing_datasets = Dataset.query.filter(
-                Dataset.dataset_id.in_(upstream_deps)
-            ).all()
-            existing_ids = {ds.dataset_id for ds in existing_datasets}
+            existing_ids = batch_fetch_existing_ids(upstream_deps)
             missing_ids = set(upstream_deps) - existing_ids
             if missing_ids:
                 return jsonify({
                     'error': f'Upstream dependencies not found: {", ".join(missing_ids)}'
                 }), 400
         
-        # Create new dataset
-        dataset = Dataset(
+        # Create new dataset; ON CONFLICT replaces the existence pre-check and
+        # RETURNING is empty when the id is already taken
+        stmt = conflict_insert(Dataset).values(
             dataset_id=data['dataset_id'],
             dataset_name=data['dataset_name'],
             dataset_type=data['dataset_type'],
             layer=data['layer'],
             upstream_dependencies=upstream_deps,
             status=data.get('status', 'active')
-        )
+        ).on_conflict_do_nothing(index_elements=['dataset_id']).returning(Dataset)
+        
+        dataset = db.session.scalars(stmt).first()
+        if dataset is None:
+            db.session.rollback()
+            return jsonify({'error': 'Dataset ID already exists'}), 400
         
-        db.session.add(dataset)
+        # Serialize before commit so the expired instance isn't reloaded
+        dataset_dict = dataset.to_dict()
         db.session.commit()
         
         return jsonify({
             'message': 'Dataset created successfully',
-            'dataset': dataset.to_dict()
+            'dataset': dataset_dict
         }), 201
         
-    except IntegrityError:
-        db.session.rollback()
-        return jsonify({'error': 'Dataset ID already exists'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @datasets_bp.route('/<dataset_id>', methods=['PUT'])
 @jwt_required()
-@limiter.limit("20 per minute")
+@limiter.limit("20 per minute", key_func=per_user_key)
 def update_dataset(dataset_id):
     """Update an existing dataset"""
     try:
@@ -149,11 +213,7 @@ def update_dataset(dataset_id):
             upstream_deps = data['upstream_dependencies']
             if upstream_deps:
                 # Exclude self from validation
-                existing_datasets = Dataset.query.filter(
-                    Dataset.dataset_id.in_(upstream_deps),
-                    Dataset.dataset_id != dataset_id
-                ).all()
-                existing_ids = {ds.dataset_id for ds in existing_datasets}
+                existing_ids = batch_fetch_existing_ids(upstream_deps, exclude_id=dataset_id)
                 missing_ids = set(upstream_deps) - existing_ids
                 if missing_ids:
                     return jsonify({
@@ -177,18 +237,19 @@ def update_dataset(dataset_id):
 
 @datasets_bp.route('/<dataset_id>', methods=['DELETE'])
 @jwt_required()
-@limiter.limit("20 per minute")
+@limiter.limit("20 per minute", key_func=per_user_key)
 def delete_dataset(dataset_id):
     """Delete a dataset"""
     try:
-        dataset = Dataset.query.get(dataset_id)
+        # Single DELETE round-trip; rowcount tells us whether it existed
+        result = db.session.execute(
+            delete(Dataset.__table__).where(Dataset.__table__.c.dataset_id == dataset_id)
+        )
+        db.session.commit()
         
-        if not dataset:
+        if result.rowcount == 0:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        db.session.delete(dataset)
-        db.session.commit()
-        
         return jsonify({
             'message': 'Dataset deleted successfully'
         }), 200
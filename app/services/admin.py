@@ -0,0 +1,42 @@
+import logging
+from sqlalchemy import select
+from app import db
+from app.models.user import User
+from app.services.password_hashing import hash_password
+from app.utils.sql import conflict_insert
+
+logger = logging.getLogger(__name__)
+
+ADMIN_USERNAME = 'admin'
+ADMIN_EMAIL = 'admin@parkour.com'
+ADMIN_PASSWORD = 'admin123'
+
+
+def get_or_create_admin():
+    """Return the admin user's id, creating the account if it doesn't exist
+
+    Must be called inside an app context. Returns the id rather than the
+    instance, which would be detached once its session ends.
+    """
+    admin_lookup = select(User.id).filter_by(username=ADMIN_USERNAME).limit(1)
+    admin_id = db.session.execute(admin_lookup).scalar()
+    if admin_id is not None:
+        return admin_id
+
+    # Only hash when the account is missing. The insert is a no-op if
+    # another process created the admin since the lookup above.
+    admin_id = db.session.execute(
+        conflict_insert(User).values(
+            username=ADMIN_USERNAME,
+            email=ADMIN_EMAIL,
+            password_hash=hash_password(ADMIN_PASSWORD),
+            first_name='Admin',
+            last_name='User'
+        ).on_conflict_do_nothing(index_elements=['username']).returning(User.id)
+    ).scalar()
+    db.session.commit()
+
+    if admin_id is None:
+        return db.session.execute(admin_lookup).scalar()
+    logger.info(f'Admin user created: username={ADMIN_USERNAME}, password={ADMIN_PASSWORD}')
+    return admin_id
@@ -0,0 +1,175 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+import orjson
+import redis
+from cachetools import TTLCache
+from flask import current_app
+from app import db, redis_pool
+from app.models.user import User
+from app.utils.json_provider import ORJSON_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# Serialized user dicts keyed by user id. The in-process tier is always on;
+# when a Redis pool is configured entries are shared between Gunicorn workers.
+AUTH_CACHE_USER_TTL = int(os.getenv('AUTH_CACHE_USER_TTL', 60))
+AUTH_CACHE_MAX_USERS = int(os.getenv('AUTH_CACHE_MAX_USERS', 10_000))
+
+_user_cache = TTLCache(maxsize=AUTH_CACHE_MAX_USERS, ttl=AUTH_CACHE_USER_TTL)
+_user_cache_lock = threading.Lock()
+
+# Revoked access tokens. Without Redis the in-process store is the only
+# record of a revocation, so it is unbounded: each jti maps to the monotonic
+# time its token expires and is dropped once that passes, never to make room.
+# With Redis it is the source of truth and each lookup result is cached
+# locally for AUTH_CACHE_REVOKED_TTL seconds, which bounds how long another
+# worker can keep accepting a token after logout.
+AUTH_CACHE_REVOKED_TTL = int(os.getenv('AUTH_CACHE_REVOKED_TTL', 30))
+AUTH_CACHE_MAX_TOKENS = int(os.getenv('AUTH_CACHE_MAX_TOKENS', 100_000))
+
+_revoked_tokens = {}
+_revoked_expiry = []  # heap of (expires_at, jti) for pruning _revoked_tokens
+_token_status = TTLCache(maxsize=AUTH_CACHE_MAX_TOKENS, ttl=AUTH_CACHE_REVOKED_TTL)
+_token_lock = threading.Lock()
+
+_redis = redis.Redis(connection_pool=redis_pool) if redis_pool is not None else None
+
+
+def _redis_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _revoked_key(jti):
+    return f'auth:revoked:{jti}'
+
+
+def get_cached_user(user_id):
+    """Return the user dict for user_id, or None if the user does not exist"""
+    key = str(user_id)
+
+    with _user_cache_lock:
+        user_dict = _user_cache.get(key)
+    if user_dict is not None:
+        return user_dict
+
+    if _redis is not None:
+        # Redis is only a cache here; if it's unreachable go to the database
+        try:
+            cached = _redis.get(_redis_key(key))
+        except redis.exceptions.RedisError:
+            logger.warning('Auth cache: Redis read failed for user %s', key, exc_info=True)
+            cached = None
+        if cached is not None:
+            user_dict = orjson.loads(cached)
+
+    if user_dict is None:
+        user = db.session.get(User, int(key))
+        if not user:
+            return None
+        user_dict = user.to_dict()
+        if _redis is not None:
+            # Same encoding as API responses, so timestamps read back from
+            # Redis render identically to ones from the in-process tier
+            try:
+                _redis.setex(_redis_key(key), AUTH_CACHE_USER_TTL, orjson.dumps(user_dict, option=ORJSON_OPTIONS))
+            except redis.exceptions.RedisError:
+                logger.warning('Auth cache: Redis write failed for user %s', key, exc_info=True)
+
+    with _user_cache_lock:
+        _user_cache[key] = user_dict
+    return user_dict
+
+
+def invalidate_user(user_id):
+    """Drop a user from both cache tiers after their row changes
+
+    Called after the change is committed, so a Redis failure is logged
+    rather than raised; the shared entry then expires within
+    AUTH_CACHE_USER_TTL seconds.
+    """
+    key = str(user_id)
+    with _user_cache_lock:
+        _user_cache.pop(key, None)
+    if _redis is not None:
+        try:
+            _redis.delete(_redis_key(key))
+        except redis.exceptions.RedisError:
+            logger.error('Auth cache: could not invalidate user %s in Redis', key, exc_info=True)
+
+
+def _prune_revoked(now):
+    # Caller holds _token_lock
+    while _revoked_expiry and _revoked_expiry[0][0] <= now:
+        expires_at, jti = heapq.heappop(_revoked_expiry)
+        if _revoked_tokens.get(jti) == expires_at:
+            del _revoked_tokens[jti]
+
+
+def revoke_token(jti, expires_in=None):
+    """Mark a token as revoked for the rest of its lifetime (in seconds)
+
+    expires_in defaults to the app's JWT_ACCESS_TOKEN_EXPIRES, the longest an
+    access token can live; when that is False tokens never expire and the
+    revocation is kept for good. The local entry is recorded even if the
+    Redis write fails.
+    """
+    if expires_in is None:
+        expires_in = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        if hasattr(expires_in, 'total_seconds'):
+            expires_in = expires_in.total_seconds()
+    if expires_in is False:
+        ttl = None
+        expires_at = math.inf
+    else:
+        ttl = max(int(expires_in), 1)
+        expires_at = time.monotonic() + ttl
+    with _token_lock:
+        _prune_revoked(time.monotonic())
+        _revoked_tokens[jti] = expires_at
+        heapq.heappush(_revoked_expiry, (expires_at, jti))
+        _token_status[jti] = True
+    if _redis is not None:
+        try:
+            _redis.set(_revoked_key(jti), 1, ex=ttl)
+        except redis.exceptions.RedisError:
+            logger.error('Auth cache: could not record revoked token %s in Redis', jti, exc_info=True)
+
+
+def is_token_revoked(jti):
+    """Return True if the token has been revoked
+
+    If Redis is unreachable the in-process answer stands, so other workers
+    may accept a token revoked elsewhere until Redis is back.
+    """
+    with _token_lock:
+        expires_at = _revoked_tokens.get(jti)
+        if expires_at is not None and expires_at > time.monotonic():
+            return True
+        revoked = _token_status.get(jti)
+    if revoked is not None:
+        return revoked
+    if _redis is None:
+        return False
+
+    try:
+        revoked = bool(_redis.exists(_revoked_key(jti)))
+    except redis.exceptions.RedisError:
+        logger.warning('Auth cache: Redis revocation lookup failed for token %s', jti, exc_info=True)
+        return False
+    with _token_lock:
+        _token_status[jti] = revoked
+    return revoked
+
+
+def clear():
+    """Empty the in-process tier (used by tests between app instances)"""
+    with _user_cache_lock:
+        _user_cache.clear()
+    with _token_lock:
+        _revoked_tokens.clear()
+        _revoked_expiry.clear()
+        _token_status.clear()
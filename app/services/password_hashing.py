@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import threading
+import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+
+# Work factor for new hashes; existing hashes carry their own cost
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+
+# bcrypt is deliberately slow (~100 ms per call) and holds the worker while it
+# runs. A sync Gunicorn worker serves one request at a time, so a pool only
+# adds IPC overhead there; set PASSWORD_HASH_WORKERS alongside a threaded
+# worker class (gthread) so concurrent logins in one worker hash in parallel.
+# 0 hashes inline on the request thread.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _get_hash_pool():
+    # Created lazily so each Gunicorn worker builds its own pool after forking.
+    # That happens on a request thread, so the hash processes come from a
+    # forkserver rather than fork(): forking a multi-threaded worker would
+    # copy locks held by other request threads (DB pool, Redis pool, logging)
+    # into the child in a locked state.
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context('forkserver')
+                )
+    return _hash_pool
+
+
+def _generate_hash(password):
+    salt = bcrypt.gensalt(rounds=BCRYPT_LOG_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _check_hash(password_hash, password):
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_password(password):
+    """Return the bcrypt hash of password as a string"""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return _generate_hash(password)
+    return _get_hash_pool().submit(_generate_hash, password).result()
+
+
+def verify_password(password_hash, password):
+    """Check password against a stored bcrypt hash"""
+    if PASSWORD_HASH_WORKERS <= 0:
+        return _check_hash(password_hash, password)
+    return _get_hash_pool().submit(_check_hash, password_hash, password).result()
@@ -1,24 +1,144 @@
+import contextlib
+import os
 import pytest
-from app import create_app, db
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+from app import create_app, db, limiter
 from app.models.user import User
+from app.services import auth_cache
 
-@pytest.fixture
+def worker_database_url():
+    """Return the test database URL for this pytest-xdist worker
+
+    Set TESTING_DATABASE_URI to run against a server database; each worker
+    then gets its own database (suffixed with the worker id) so commits from
+    parallel workers never interleave. In-memory SQLite is already private
+    to each worker process.
+
+    pytest.ini runs the suite with --dist loadfile, so the invariant is:
+    each worker gets an isolated database, and every test in a file runs on
+    the same worker, sharing its session-scoped fixtures (schema, test
+    user, clients).
+    """
+    url = os.environ.get('TESTING_DATABASE_URI', 'sqlite:///:memory:')
+    if url.startswith('sqlite'):
+        return url
+    worker = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
+    url = make_url(url)
+    return url.set(database=f'{url.database}_{worker}').render_as_string(hide_password=False)
+
+def ensure_database(url):
+    """Create a worker's Postgres database if it doesn't exist yet"""
+    url = make_url(url)
+    if url.get_backend_name() != 'postgresql':
+        return
+    engine = create_engine(url.set(database='postgres'), isolation_level='AUTOCOMMIT')
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text('SELECT 1 FROM pg_database WHERE datname = :name'),
+            {'name': url.database}
+        ).scalar()
+        if not exists:
+            conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+    engine.dispose()
+
+@pytest.fixture(scope='session')
 def app():
-    """Create application for testing"""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    """Create application for testing, once per session"""
+    database_url = worker_database_url()
+    ensure_database(database_url)
+    os.environ['TESTING_DATABASE_URI'] = database_url
+    
+    app = create_app(testing=True)
     app.config['JWT_SECRET_KEY'] = 'test-jwt-secret-key'
     app.config['SECRET_KEY'] = 'test-secret-key'
     
     with app.app_context():
-        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            # pysqlite's own transaction handling breaks SAVEPOINT; let
+            # SQLAlchemy emit BEGIN itself so nested transactions work
+            @event.listens_for(db.engine, 'connect')
+            def do_connect(dbapi_connection, connection_record):
+                dbapi_connection.isolation_level = None
+            
+            @event.listens_for(db.engine, 'begin')
+            def do_begin(conn):
+                conn.exec_driver_sql('BEGIN')
+        
         yield app
-        db.drop_all()
+
+@pytest.fixture(scope='session')
+def _db(app):
+    """Create the schema once per session"""
+    db.create_all()
+    yield db
+    db.drop_all()
+
+@pytest.fixture(scope='session')
+def connection(_db):
+    """Hold one connection in an outer transaction that is never committed"""
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    yield connection
+    transaction.rollback()
+    connection.close()
+
+@contextlib.contextmanager
+def joined_session(connection):
+    """Swap db.session for one joined to connection while the block runs
+
+    commit() then only releases a savepoint, so the writes stay inside
+    whatever transaction connection is currently in.
+    """
+    original_session = db.session
+    db.session = scoped_session(sessionmaker(
+        bind=connection,
+        join_transaction_mode='create_savepoint'
+    ))
+    try:
+        yield db.session
+    finally:
+        db.session.remove()
+        db.session = original_session
+
+@pytest.fixture(autouse=True)
+def db_session(connection):
+    """Run each test inside a SAVEPOINT that is rolled back afterwards
+
+    Nothing a test writes survives it; rows created by session-scoped
+    fixtures live in the outer transaction and are shared by every test.
+    """
+    nested = connection.begin_nested()
+    with joined_session(connection) as session:
+        yield session
+    nested.rollback()
+    auth_cache.clear()
+    limiter.reset()
 
 @pytest.fixture
+def count_queries(connection):
+    """Return a context manager collecting the SQL run on the test connection"""
+    @contextlib.contextmanager
+    def _count_queries():
+        queries = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            # Savepoint bookkeeping comes from db_session, not the code under test
+            if 'SAVEPOINT' not in statement:
+                queries.append(statement)
+        
+        event.listen(connection, 'before_cursor_execute', record)
+        try:
+            yield queries
+        finally:
+            event.remove(connection, 'before_cursor_execute', record)
+    
+    return _count_queries
+
+@pytest.fixture(scope='session')
 def client(app):
-    """Create test client"""
+    """Create test client, shared by the whole session"""
     return app.test_client()
 
 @pytest.fixture
@@ -26,28 +146,45 @@ def runner(app):
     """Create test CLI runner"""
     return app.test_cli_runner()
 
-@pytest.fixture
-def auth_headers(client):
-    """Create authenticated user and return auth headers"""
-    # Create test user
-    user = User(
-        username='testuser',
-        email='test@example.com',
-        first_name='Test',
-        last_name='User'
-    )
-    user.set_password('testpass123')
-    db.session.add(user)
-    db.session.commit()
-    
-    # Login to get token
-    response = client.post('/api/auth/login', json={
-        'username': 'testuser',
-        'password': 'testpass123'
-    })
+@pytest.fixture(scope='session')
+def auth_headers(client, connection):
+    """Create authenticated user and return auth headers, once per session
+
+    The user is committed into the outer transaction, before any test's
+    savepoint, so it outlives per-test rollbacks and bcrypt only runs for
+    a single login. Tests that revoke a token should log in for their own.
+    """
+    with joined_session(connection):
+        # Create test user
+        user = User(
+            username='testuser',
+            email='test@example.com',
+            first_name='Test',
+            last_name='User'
+        )
+        user.set_password('testpass123')
+        db.session.add(user)
+        db.session.commit()
+        
+        # Login to get token
+        response = client.post('/api/auth/login', json={
+            'username': 'testuser',
+            'password': 'testpass123'
+        })
     token = response.json['access_token']
     
     return {'Authorization': f'Bearer {token}'}
 
+@pytest.fixture(scope='session')
+def auth_client(app, auth_headers):
+    """Create a test client that sends the test user's token on every request
+
+    The header lives in environ_base, so calls don't need headers=...; use
+    the plain client for anonymous requests.
+    """
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = auth_headers['Authorization']
+    return client
+
 
 
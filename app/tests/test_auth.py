@@ -13,8 +13,9 @@ def test_register_user(client):
     })
     
     assert response.status_code == 201
-    assert 'access_token' in response.json
-    assert response.json['user']['username'] == 'newuser'
+    data = response.json
+    assert 'access_token' in data
+    assert data['user']['username'] == 'newuser'
 
 def test_register_duplicate_username(client):
     """Test registration with duplicate username"""
@@ -39,6 +40,29 @@ def test_register_duplicate_username(client):
     assert response.status_code == 400
     assert 'already exists' in response.json['error'].lower()
 
+def test_register_duplicate_email(client):
+    """Test registration with duplicate email"""
+    # Create first user
+    client.post('/api/auth/register', json={
+        'username': 'firstuser',
+        'email': 'shared@example.com',
+        'password': 'password123',
+        'first_name': 'First',
+        'last_name': 'User'
+    })
+
+    # Try to register with same email
+    response = client.post('/api/auth/register', json={
+        'username': 'seconduser',
+        'email': 'shared@example.com',
+        'password': 'password123',
+        'first_name': 'Second',
+        'last_name': 'User'
+    })
+
+    assert response.status_code == 400
+    assert response.json['error'] == 'Email already exists'
+
 def test_login_success(client):
     """Test successful login"""
     # Create user first
@@ -59,8 +83,9 @@ def test_login_success(client):
     })
     
     assert response.status_code == 200
-    assert 'access_token' in response.json
-    assert response.json['user']['username'] == 'loginuser'
+    data = response.json
+    assert 'access_token' in data
+    assert data['user']['username'] == 'loginuser'
 
 def test_login_invalid_credentials(client):
     """Test login with invalid credentials"""
@@ -72,9 +97,9 @@ def test_login_invalid_credentials(client):
     assert response.status_code == 401
     assert 'invalid' in response.json['error'].lower()
 
-def test_get_profile(client, auth_headers):
+def test_get_profile(auth_client):
     """Test getting user profile"""
-    response = client.get('/api/auth/profile', headers=auth_headers)
+    response = auth_client.get('/api/auth/profile')
     
     assert response.status_code == 200
     assert response.json['user']['username'] == 'testuser'
@@ -85,18 +110,48 @@ def test_get_profile_unauthorized(client):
     
     assert response.status_code == 401
 
-def test_update_profile(client, auth_headers):
+def test_logout_revokes_token(client, auth_client):
+    """Test that a token is rejected after logout"""
+    # Log in separately so the shared session token stays valid
+    response = client.post('/api/auth/login', json={
+        'username': 'testuser',
+        'password': 'testpass123'
+    })
+    headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    
+    response = client.post('/api/auth/logout', headers=headers)
+    
+    assert response.status_code == 200
+    
+    response = client.get('/api/auth/profile', headers=headers)
+    assert response.status_code == 401
+    
+    response = auth_client.get('/api/auth/profile')
+    assert response.status_code == 200
+
+def test_update_profile(auth_client):
     """Test updating user profile"""
-    response = client.put('/api/auth/profile', 
-                         headers=auth_headers,
-                         json={
-                             'first_name': 'Updated',
-                             'last_name': 'Name'
-                         })
+    response = auth_client.put('/api/auth/profile', 
+                              json={
+                                  'first_name': 'Updated',
+                                  'last_name': 'Name'
+                              })
+    
+    assert response.status_code == 200
+    data = response.json
+    assert data['user']['first_name'] == 'Updated'
+    assert data['user']['last_name'] == 'Name'
+
+def test_get_profile_after_update(auth_client):
+    """Test profile reads are not served stale after an update"""
+    auth_client.get('/api/auth/profile')
+    auth_client.put('/api/auth/profile',
+                    json={'first_name': 'Changed'})
+    
+    response = auth_client.get('/api/auth/profile')
     
     assert response.status_code == 200
-    assert response.json['user']['first_name'] == 'Updated'
-    assert response.json['user']['last_name'] == 'Name'
+    assert response.json['user']['first_name'] == 'Changed'
 
 
 
@@ -1,64 +1,105 @@
 import pytest
-from app import db
+from flask_jwt_extended import create_access_token
+from limits import parse_many
+from sqlalchemy import insert
+from app import db, default_limits
 from app.models.dataset import Dataset
+from app.models.user import User
 
-def test_create_dataset(client, auth_headers):
+def test_create_dataset(auth_client):
     """Test creating a new dataset"""
-    response = client.post('/api/datasets', 
-                          headers=auth_headers,
-                          json={
-                              'dataset_id': 'ds_001',
-                              'dataset_name': 'Test Dataset',
-                              'dataset_type': 'table',
-                              'layer': 'bronze',
-                              'upstream_dependencies': ['ds_000'],
-                              'status': 'active'
-                          })
+    # Upstream dependency must exist
+    db.session.add(Dataset(
+        dataset_id='ds_000',
+        dataset_name='Source Dataset',
+        dataset_type='table',
+        layer='bronze',
+        status='active'
+    ))
+    db.session.commit()
+    
+    response = auth_client.post('/api/datasets', 
+                               json={
+                                   'dataset_id': 'ds_001',
+                                   'dataset_name': 'Test Dataset',
+                                   'dataset_type': 'table',
+                                   'layer': 'bronze',
+                                   'upstream_dependencies': ['ds_000'],
+                                   'status': 'active'
+                               })
     
     assert response.status_code == 201
-    assert response.json['dataset']['dataset_id'] == 'ds_001'
-    assert response.json['dataset']['dataset_name'] == 'Test Dataset'
-    assert response.json['dataset']['upstream_dependencies'] == ['ds_000']
+    data = response.json
+    assert data['dataset']['dataset_id'] == 'ds_001'
+    assert data['dataset']['dataset_name'] == 'Test Dataset'
+    assert data['dataset']['upstream_dependencies'] == ['ds_000']
 
-def test_create_dataset_missing_fields(client, auth_headers):
+def test_create_dataset_missing_upstream(auth_client):
+    """Test creating a dataset with an unknown upstream dependency"""
+    response = auth_client.post('/api/datasets',
+                               json={
+                                   'dataset_id': 'ds_orphan',
+                                   'dataset_name': 'Orphan Dataset',
+                                   'dataset_type': 'table',
+                                   'layer': 'silver',
+                                   'upstream_dependencies': ['ds_missing']
+                               })
+    
+    assert response.status_code == 400
+    assert 'ds_missing' in response.json['error']
+
+def test_batch_fetch_existing_ids_spans_chunks(app):
+    """Test dependency lookup across several IN-list chunks"""
+    from app.routes.datasets import batch_fetch_existing_ids
+    
+    db.session.execute(insert(Dataset), [
+        dict(dataset_id='ds_chunk_a', dataset_name='A', dataset_type='table', layer='bronze'),
+        dict(dataset_id='ds_chunk_b', dataset_name='B', dataset_type='table', layer='bronze')
+    ])
+    db.session.commit()
+    
+    ids = [f'ds_missing_{i}' for i in range(1200)] + ['ds_chunk_a', 'ds_chunk_b']
+    
+    assert batch_fetch_existing_ids(ids) == {'ds_chunk_a', 'ds_chunk_b'}
+    assert batch_fetch_existing_ids(ids, exclude_id='ds_chunk_a') == {'ds_chunk_b'}
+
+def test_create_dataset_missing_fields(auth_client):
     """Test creating dataset with missing required fields"""
-    response = client.post('/api/datasets',
-                          headers=auth_headers,
-                          json={
-                              'dataset_id': 'ds_002',
-                              'dataset_name': 'Test Dataset 2'
-                              # Missing dataset_type and layer
-                          })
+    response = auth_client.post('/api/datasets',
+                               json={
+                                   'dataset_id': 'ds_002',
+                                   'dataset_name': 'Test Dataset 2'
+                                   # Missing dataset_type and layer
+                               })
     
     assert response.status_code == 400
     assert 'required' in response.json['error'].lower()
 
-def test_create_duplicate_dataset_id(client, auth_headers):
+def test_create_duplicate_dataset_id(auth_client):
     """Test creating dataset with duplicate ID"""
     # Create first dataset
-    client.post('/api/datasets',
-                headers=auth_headers,
-                json={
-                    'dataset_id': 'ds_003',
-                    'dataset_name': 'First Dataset',
-                    'dataset_type': 'table',
-                    'layer': 'bronze'
-                })
+    db.session.execute(insert(Dataset).values(
+        dataset_id='ds_003',
+        dataset_name='First Dataset',
+        dataset_type='table',
+        layer='bronze',
+        status='active'
+    ))
+    db.session.commit()
     
     # Try to create duplicate
-    response = client.post('/api/datasets',
-                          headers=auth_headers,
-                          json={
-                              'dataset_id': 'ds_003',
-                              'dataset_name': 'Second Dataset',
-                              'dataset_type': 'table',
-                              'layer': 'bronze'
-                          })
+    response = auth_client.post('/api/datasets',
+                               json={
+                                   'dataset_id': 'ds_003',
+                                   'dataset_name': 'Second Dataset',
+                                   'dataset_type': 'table',
+                                   'layer': 'bronze'
+                               })
     
     assert response.status_code == 400
     assert 'already exists' in response.json['error'].lower()
 
-def test_get_dataset(client, auth_headers):
+def test_get_dataset(auth_client):
     """Test getting a specific dataset"""
     # Create dataset first
     dataset = Dataset(
@@ -73,25 +114,19 @@ def test_get_dataset(client, auth_headers):
     db.session.commit()
     
     # Get the dataset
-    response = client.get('/api/datasets/ds_004', headers=auth_headers)
+    response = auth_client.get('/api/datasets/ds_004')
     
     assert response.status_code == 200
-    assert response.json['dataset']['dataset_id'] == 'ds_004'
-    assert response.json['dataset']['dataset_name'] == 'Get Test Dataset'
-    assert len(response.json['dataset']['upstream_dependencies']) == 2
-
-def test_get_nonexistent_dataset(client, auth_headers):
-    """Test getting a dataset that doesn't exist"""
-    response = client.get('/api/datasets/nonexistent', headers=auth_headers)
-    
-    assert response.status_code == 404
-    assert 'not found' in response.json['error'].lower()
+    data = response.json
+    assert data['dataset']['dataset_id'] == 'ds_004'
+    assert data['dataset']['dataset_name'] == 'Get Test Dataset'
+    assert len(data['dataset']['upstream_dependencies']) == 2
 
-def test_get_all_datasets(client, auth_headers):
+def test_get_all_datasets(auth_client, count_queries):
     """Test getting all datasets"""
-    # Create multiple datasets
-    datasets = [
-        Dataset(
+    # Create multiple datasets in one multi-row INSERT
+    db.session.execute(insert(Dataset), [
+        dict(
             dataset_id=f'ds_{i:03d}',
             dataset_name=f'Dataset {i}',
             dataset_type='table',
@@ -99,47 +134,111 @@ def test_get_all_datasets(client, auth_headers):
             status='active'
         )
         for i in range(5, 8)
-    ]
-    db.session.add_all(datasets)
+    ])
     db.session.commit()
     
-    # Get all datasets
-    response = client.get('/api/datasets', headers=auth_headers)
+    # Get all datasets; one COUNT plus one page SELECT regardless of rows
+    with count_queries() as queries:
+        response = auth_client.get('/api/datasets')
     
+    assert len(queries) <= 2
     assert response.status_code == 200
-    assert len(response.json['datasets']) >= 3
-    assert 'total' in response.json
-    assert 'page' in response.json
+    data = response.json
+    assert len(data['datasets']) >= 3
+    assert 'total' in data
+    assert 'next_cursor' in data
+
+def test_get_datasets_cursor_pagination(auth_client):
+    """Test walking the dataset list with keyset cursors"""
+    db.session.execute(insert(Dataset), [
+        dict(
+            dataset_id=f'ds_page_{i}',
+            dataset_name=f'Paged Dataset {i}',
+            dataset_type='table',
+            layer='bronze',
+            status='active'
+        )
+        for i in range(3)
+    ])
+    db.session.commit()
+    
+    first = auth_client.get('/api/datasets?per_page=2')
+    
+    assert first.status_code == 200
+    first_page = first.json
+    assert len(first_page['datasets']) == 2
+    assert first_page['total'] == 3
+    assert first_page['next_cursor']
+    
+    second = auth_client.get(f"/api/datasets?per_page=2&cursor={first_page['next_cursor']}")
+    
+    assert second.status_code == 200
+    second_page = second.json
+    assert len(second_page['datasets']) == 1
+    assert second_page['next_cursor'] is None
+    seen = {d['dataset_id'] for d in first_page['datasets'] + second_page['datasets']}
+    assert seen == {'ds_page_0', 'ds_page_1', 'ds_page_2'}
+
+def test_get_datasets_stream(auth_client):
+    """Test streaming the full filtered dataset listing"""
+    db.session.execute(insert(Dataset), [
+        dict(
+            dataset_id=f'ds_stream_{i}',
+            dataset_name=f'Streamed Dataset {i}',
+            dataset_type='table',
+            layer='bronze' if i < 3 else 'silver',
+            status='active'
+        )
+        for i in range(4)
+    ])
+    db.session.commit()
+    
+    response = auth_client.get('/api/datasets?stream=1&layer=bronze')
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    ids = {d['dataset_id'] for d in response.json['datasets']}
+    assert ids == {'ds_stream_0', 'ds_stream_1', 'ds_stream_2'}
+
+def test_get_datasets_invalid_cursor(auth_client):
+    """Test that a malformed cursor is rejected"""
+    response = auth_client.get('/api/datasets?cursor=not-a-cursor')
+    
+    assert response.status_code == 400
+    assert 'cursor' in response.json['error'].lower()
 
-def test_get_datasets_with_filters(client, auth_headers):
+def test_get_datasets_with_filters(auth_client, count_queries):
     """Test getting datasets with filters"""
     # Create datasets with different statuses
-    active_dataset = Dataset(
-        dataset_id='ds_active',
-        dataset_name='Active Dataset',
-        dataset_type='table',
-        layer='bronze',
-        status='active'
-    )
-    inactive_dataset = Dataset(
-        dataset_id='ds_inactive',
-        dataset_name='Inactive Dataset',
-        dataset_type='table',
-        layer='bronze',
-        status='inactive'
-    )
-    db.session.add_all([active_dataset, inactive_dataset])
+    db.session.execute(insert(Dataset), [
+        dict(
+            dataset_id='ds_active',
+            dataset_name='Active Dataset',
+            dataset_type='table',
+            layer='bronze',
+            status='active'
+        ),
+        dict(
+            dataset_id='ds_inactive',
+            dataset_name='Inactive Dataset',
+            dataset_type='table',
+            layer='bronze',
+            status='inactive'
+        )
+    ])
     db.session.commit()
     
     # Filter by status
-    response = client.get('/api/datasets?status=active', headers=auth_headers)
+    with count_queries() as queries:
+        response = auth_client.get('/api/datasets?status=active')
     
+    assert len(queries) <= 2
     assert response.status_code == 200
     assert all(d['status'] == 'active' for d in response.json['datasets'])
 
-def test_update_dataset(client, auth_headers):
+def test_update_dataset(auth_client):
     """Test updating a dataset"""
-    # Create dataset
+    # Create dataset and the upstream it will depend on
     dataset = Dataset(
         dataset_id='ds_update',
         dataset_name='Original Name',
@@ -147,33 +246,48 @@ def test_update_dataset(client, auth_headers):
         layer='bronze',
         status='active'
     )
-    db.session.add(dataset)
+    upstream = Dataset(
+        dataset_id='ds_001',
+        dataset_name='Upstream Dataset',
+        dataset_type='table',
+        layer='bronze',
+        status='active'
+    )
+    db.session.add_all([dataset, upstream])
     db.session.commit()
     
     # Update dataset
-    response = client.put('/api/datasets/ds_update',
-                        headers=auth_headers,
-                        json={
-                            'dataset_name': 'Updated Name',
-                            'status': 'inactive',
-                            'upstream_dependencies': ['ds_001']
-                        })
+    response = auth_client.put('/api/datasets/ds_update',
+                             json={
+                                 'dataset_name': 'Updated Name',
+                                 'status': 'inactive',
+                                 'upstream_dependencies': ['ds_001']
+                             })
     
     assert response.status_code == 200
-    assert response.json['dataset']['dataset_name'] == 'Updated Name'
-    assert response.json['dataset']['status'] == 'inactive'
-    assert response.json['dataset']['upstream_dependencies'] == ['ds_001']
+    data = response.json
+    assert data['dataset']['dataset_name'] == 'Updated Name'
+    assert data['dataset']['status'] == 'inactive'
+    assert data['dataset']['upstream_dependencies'] == ['ds_001']
 
-def test_update_nonexistent_dataset(client, auth_headers):
-    """Test updating a dataset that doesn't exist"""
-    response = client.put('/api/datasets/nonexistent',
-                         headers=auth_headers,
-                         json={'dataset_name': 'New Name'})
+def test_update_dataset_self_dependency(auth_client):
+    """Test that a dataset cannot list itself as an upstream dependency"""
+    db.session.add(Dataset(
+        dataset_id='ds_self',
+        dataset_name='Self Referencing',
+        dataset_type='table',
+        layer='silver',
+        status='active'
+    ))
+    db.session.commit()
     
-    assert response.status_code == 404
-    assert 'not found' in response.json['error'].lower()
+    response = auth_client.put('/api/datasets/ds_self',
+                             json={'upstream_dependencies': ['ds_self']})
+    
+    assert response.status_code == 400
+    assert 'ds_self' in response.json['error']
 
-def test_delete_dataset(client, auth_headers):
+def test_delete_dataset(auth_client):
     """Test deleting a dataset"""
     # Create dataset
     dataset = Dataset(
@@ -187,22 +301,66 @@ def test_delete_dataset(client, auth_headers):
     db.session.commit()
     
     # Delete dataset
-    response = client.delete('/api/datasets/ds_delete', headers=auth_headers)
+    response = auth_client.delete('/api/datasets/ds_delete')
     
     assert response.status_code == 200
     assert 'deleted successfully' in response.json['message'].lower()
     
     # Verify it's deleted
-    get_response = client.get('/api/datasets/ds_delete', headers=auth_headers)
+    get_response = auth_client.get('/api/datasets/ds_delete')
     assert get_response.status_code == 404
 
-def test_delete_nonexistent_dataset(client, auth_headers):
-    """Test deleting a dataset that doesn't exist"""
-    response = client.delete('/api/datasets/nonexistent', headers=auth_headers)
+@pytest.mark.parametrize('method, body', [
+    ('GET', None),
+    ('PUT', {'dataset_name': 'New Name'}),
+    ('DELETE', None),
+])
+def test_nonexistent_dataset(auth_client, method, body):
+    """Test getting, updating and deleting a dataset that doesn't exist"""
+    response = auth_client.open('/api/datasets/nonexistent',
+                                method=method,
+                                json=body)
     
     assert response.status_code == 404
     assert 'not found' in response.json['error'].lower()
 
+def test_write_limits_are_per_user(app, auth_client):
+    """Test that writes are throttled per user and reads are never throttled"""
+    db.session.add(Dataset(
+        dataset_id='ds_read',
+        dataset_name='Read Only',
+        dataset_type='table',
+        layer='bronze',
+        status='active'
+    ))
+    other_user = User(
+        username='otheruser',
+        email='other@example.com',
+        password_hash='unused',
+        first_name='Other',
+        last_name='User'
+    )
+    db.session.add(other_user)
+    db.session.commit()
+    
+    # Both clients share 127.0.0.1, so only a per-user key keeps them apart
+    other_client = app.test_client()
+    other_client.environ_base['HTTP_AUTHORIZATION'] = (
+        f'Bearer {create_access_token(identity=str(other_user.id))}'
+    )
+    
+    for _ in range(20):
+        assert auth_client.delete('/api/datasets/nonexistent').status_code == 404
+    assert auth_client.delete('/api/datasets/nonexistent').status_code == 429
+    
+    assert other_client.delete('/api/datasets/nonexistent').status_code == 404
+    
+    # Exempt reads stay available to the throttled user, past the default limits
+    burst = min(item.amount for item in parse_many(default_limits)) + 1
+    for url in ('/api/datasets', '/api/datasets/ds_read', '/api/auth/profile'):
+        for _ in range(burst):
+            assert auth_client.get(url).status_code == 200
+
 def test_datasets_require_authentication(client):
     """Test that dataset endpoints require authentication"""
     # Try to access without auth
@@ -215,5 +373,16 @@ def test_datasets_require_authentication(client):
     response = client.get('/api/datasets/ds_001')
     assert response.status_code == 401
 
+def test_preflight_skips_authentication(client):
+    """Test that CORS preflight is answered without a token"""
+    response = client.options('/api/datasets', headers={
+        'Origin': 'http://localhost:4200',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'Authorization'
+    })
+    
+    assert response.status_code == 204
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:4200'
+
 
 
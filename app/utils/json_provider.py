@@ -0,0 +1,23 @@
+import orjson
+from flask.json.provider import JSONProvider
+
+# Timestamps are stored as naive UTC, so serialize them with an explicit offset
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider that serializes with orjson instead of the stdlib encoder"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=ORJSON_OPTIONS),
+            mimetype='application/json'
+        )
@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import text
+from app import db
+
+
+def encode_cursor(created_ts, dataset_id):
+    """Encode a (created_ts, dataset_id) keyset position as an opaque token"""
+    payload = json.dumps([created_ts.isoformat(), dataset_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a token produced by encode_cursor; raises ValueError if malformed"""
+    try:
+        created_ts, dataset_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_ts), str(dataset_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def approximate_count(table_name):
+    """Return the planner's row estimate for a table, or None if unavailable
+
+    Reads pg_class.reltuples, which is O(1) but only as fresh as the last
+    ANALYZE/autovacuum. Returns None on other dialects or for tables that
+    have never been analyzed so callers can fall back to COUNT(*).
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    estimate = db.session.execute(
+        text('SELECT reltuples::bigint FROM pg_class WHERE relname = :name'),
+        {'name': table_name}
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
@@ -0,0 +1,14 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+
+
+def conflict_insert(target):
+    """Return an INSERT for target supporting on_conflict_do_nothing() on the bound dialect
+
+    Postgres renders ON CONFLICT ... DO NOTHING; SQLite (used by the tests)
+    accepts the same clause, so callers don't need to branch on dialect.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite_insert(target)
+    return pg_insert(target)
@@ -3,77 +3,131 @@
 Script to initialize database tables.
 This can be run manually or as part of the startup process.
 """
+import logging
+import os
+import random
 import sys
 import time
-from app import create_app, db
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+import redis
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app, db, redis_pool
 from app.models.user import User
 from app.models.dataset import Dataset
+from app.services.admin import get_or_create_admin
 
-def wait_for_db(max_retries=30, delay=1):
-    """Wait for database to be ready"""
-    app = create_app()
+logger = logging.getLogger('init_tables')
+
+def probe(service, deadline, delay=0.1, max_delay=5):
+    """Retry one service's readiness check until it passes or deadline is hit
+
+    service is a (name, check, retry_on, reset) tuple: check() raises one of
+    the retry_on exceptions while the backend is still coming up, and
+    reset() (if given) drops broken connections before the next attempt.
+    """
+    name, check, retry_on, reset = service
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            check()
+            logger.info(f"✓ {name} connection successful!")
+            return True
+        except retry_on as e:
+            if reset is not None:
+                reset()
+            # Double the wait each time up to max_delay, with jitter so
+            # several containers don't retry in lockstep
+            sleep = min(max_delay, delay * 2 ** attempt) + random.uniform(0, 0.2)
+            if time.monotonic() + sleep > deadline:
+                logger.error(f"✗ Failed to connect to {name} after {attempt} attempts")
+                logger.error(f"Error: {e}")
+                return False
+            logger.info(f"Waiting for {name}... (attempt {attempt}, retrying in {sleep:.1f}s)")
+            time.sleep(sleep)
+
+def wait_for_services(app, timeout=60):
+    """Wait for the database (and Redis, when configured) to be ready
+
+    Each backend is probed on its own thread so their start-up waits
+    overlap instead of adding up.
+    """
+    deadline = time.monotonic() + timeout
     with app.app_context():
-        for i in range(max_retries):
-            try:
-                # Try to connect to the database
-                db.engine.connect()
-                print("✓ Database connection successful!")
-                return True
-            except Exception as e:
-                if i < max_retries - 1:
-                    print(f"Waiting for database... (attempt {i+1}/{max_retries})")
-                    time.sleep(delay)
-                else:
-                    print(f"✗ Failed to connect to database after {max_retries} attempts")
-                    print(f"Error: {e}")
-                    return False
-    return False
+        engine = db.engine
+    
+    def check_database():
+        # Round-trip a trivial query; release the connection right away
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    
+    services = [('Database', check_database, OperationalError, engine.dispose)]
+    if redis_pool is not None:
+        services.append((
+            'Redis',
+            redis.Redis(connection_pool=redis_pool).ping,
+            (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError),
+            redis_pool.disconnect
+        ))
+    
+    with ThreadPoolExecutor(max_workers=len(services)) as executor:
+        results = list(executor.map(probe, services, repeat(deadline)))
+    return all(results)
 
-def init_tables():
+def apply_schema_sql(path):
+    """Run a dumped schema file (see scripts/dump_schema.py) in one round trip"""
+    with open(path) as f:
+        sql = f.read()
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'sqlite':
+            # sqlite3 only runs one statement per execute()
+            conn.connection.driver_connection.executescript(sql)
+        else:
+            conn.exec_driver_sql(sql)
+
+def init_tables(app):
     """Create all database tables"""
-    app = create_app()
+    schema_sql_path = os.getenv('SCHEMA_SQL_PATH')
     with app.app_context():
         try:
-            print("Creating database tables...")
-            db.create_all()
-            print("✓ Database tables created successfully!")
-            
-            # Create admin user if it doesn't exist
-            admin_user = User.query.filter_by(username='admin').first()
-            if not admin_user:
-                admin_user = User(
-                    username='admin',
-                    email='admin@parkour.com',
-                    first_name='Admin',
-                    last_name='User'
-                )
-                admin_user.set_password('admin123')
-                db.session.add(admin_user)
-                db.session.commit()
-                print("✓ Admin user created: username=admin, password=admin123")
+            logger.info("Creating database tables...")
+            if schema_sql_path:
+                apply_schema_sql(schema_sql_path)
             else:
-                print("✓ Admin user already exists")
+                db.create_all()
+            logger.info("✓ Database tables created successfully!")
+            
+            get_or_create_admin()
+            logger.info("✓ Admin user ready")
             
             return True
         except Exception as e:
-            print(f"✗ Error creating tables: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"✗ Error creating tables: {e}")
             return False
 
-if __name__ == '__main__':
-    print("=" * 50)
-    print("Initializing Parkour API Database")
-    print("=" * 50)
+def main():
+    """Build the app once and run every initialization step against it"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     
-    if not wait_for_db():
+    logger.info("=" * 50)
+    logger.info("Initializing Parkour API Database")
+    logger.info("=" * 50)
+    
+    app = create_app()
+    
+    if not wait_for_services(app):
         sys.exit(1)
     
-    if not init_tables():
+    if not init_tables(app):
         sys.exit(1)
     
-    print("=" * 50)
-    print("Database initialization complete!")
-    print("=" * 50)
+    logger.info("=" * 50)
+    logger.info("Database initialization complete!")
+    logger.info("=" * 50)
+
+if __name__ == '__main__':
+    main()
 
 
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Print the DDL for every model table and index.
+
+Run it against the target database (so the SQL matches its dialect) and
+point SCHEMA_SQL_PATH at the output to let init_tables.py create the
+schema in a single round trip instead of db.create_all():
+
+    python scripts/dump_schema.py > schema.sql
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.schema import CreateIndex, CreateTable
+from app import create_app, db
+
+def dump_schema():
+    """Return the CREATE TABLE/INDEX statements for the current metadata"""
+    statements = []
+    for table in db.metadata.sorted_tables:
+        # IF NOT EXISTS keeps the file safe to apply on every container start
+        statements.append(CreateTable(table, if_not_exists=True))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(CreateIndex(index, if_not_exists=True))
+    return ''.join(
+        f'{str(statement.compile(db.engine)).strip()};\n\n' for statement in statements
+    )
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        sys.stdout.write(dump_schema())